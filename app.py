@@ -1,10 +1,16 @@
 import streamlit as st
-import tweepy
+from tweepy.asynchronous import AsyncClient, AsyncPaginator
 import pandas as pd
-import matplotlib.pyplot as plt
+import altair as alt
 from datetime import datetime, timedelta
+from itertools import compress
 import re
+import string
+import asyncio
+import aiohttp
+import threading
 import time
+import random
 import os
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 
@@ -15,46 +21,111 @@ st.set_page_config(
     layout="wide"
 )
 
+# Shared VADER analyzer; building one loads the full lexicon, so do it once
+_VADER = SentimentIntensityAnalyzer()
+
+# Words that mark a tweet as expressing an opinion
+_OPINION_WORDS = frozenset([
+    'think', 'feel', 'believe', 'opinion', 'love', 'hate',
+    'amazing', 'terrible', 'worst', 'best', 'overrated',
+    'underrated', 'deserves', 'should', 'would', 'could',
+    'great', 'awful', 'bad', 'good', 'fantastic', 'horrible'
+])
+
+# Sentiment labels in display order
+_SENTIMENTS = ['positive', 'neutral', 'negative']
+
+# Background colors for sentiment labels in the results table
+_COLOR_MAP = {
+    'positive': '#2ecc7133',
+    'neutral': '#95a5a633',
+    'negative': '#e74c3c33'
+}
+
+# How long fetched tweets are reused before querying the API again, in seconds
+_FETCH_TTL = 60
+
+# Links to strip from tweet text
+_URL_RE = re.compile(r'https?://\S+|www\.\S+')
+
+# News headlines and announcements, e.g. "BREAKING: ..." or "Just in: ..."
+_NEWS_RE = re.compile(
+    r'^\s*(BREAKING|UPDATE|WATCH|NEW|EXCLUSIVE|REPORT|JUST IN)\s*:',
+    re.IGNORECASE
+)
+
+@st.cache_resource(show_spinner=False)
+def _event_loop():
+    """
+    Background event loop shared by every session in the server process.
+    aiohttp sessions are bound to the loop that created them, so the
+    client's session and all fetches run here rather than in a fresh
+    asyncio.run loop per click.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+def _run(coro):
+    """Run a coroutine on the shared event loop and return its result."""
+    return asyncio.run_coroutine_threadsafe(coro, _event_loop()).result()
+
+async def _open_session():
+    return aiohttp.ClientSession()
+
+@st.cache_resource(show_spinner=False)
 def setup_twitter_client():
-    """Initialize and return the Twitter API client."""
+    """
+    Initialize and return the Twitter API client. The client is cached
+    process-wide, so all users and sessions share it and its connection pool.
+    """
     try:
         bearer_token = st.secrets["TWITTER_BEARER_TOKEN"]
         if not bearer_token:
             st.error("Twitter API token not found. Please check your .streamlit/secrets.toml file.")
             return None
-        client = tweepy.Client(bearer_token=bearer_token)
+        client = AsyncClient(bearer_token=bearer_token, wait_on_rate_limit=True)
+        
+        # Without a session, tweepy opens (and closes) a new one per request
+        client.session = _run(_open_session())
         return client
     except Exception as e:
         st.error(f"Error initializing Twitter client: {str(e)}")
         return None
 
-def clean_text(text):
+def clean_texts(texts):
     """
-    Clean tweet text while preserving sentiment indicators.
+    Clean a Series of tweet texts while preserving sentiment indicators.
     Filter out news-style content.
+    
+    Args:
+        texts (pd.Series): Raw tweet texts
+        
+    Returns:
+        tuple: Cleaned texts (pd.Series, empty for tweets that should be
+            skipped) and their lowercase word lists (pd.Series)
     """
     # Skip news headlines and announcements
-    if any(text.strip().startswith(prefix) for prefix in [
-        'BREAKING:', 'Breaking:', 'UPDATE:', 'WATCH:', 'NEW:', 'EXCLUSIVE:',
-        'REPORT:', 'Report:', 'JUST IN:', 'Just in:'
-    ]):
-        return ""
+    is_news = texts.str.match(_NEWS_RE)
         
-    # Remove URLs but keep mentions and hashtags
-    text = re.sub(r'http\S+|www\S+|https\S+', '', text, flags=re.MULTILINE)
-    
-    # Remove extra whitespace
-    text = ' '.join(text.split())
+    # Remove URLs but keep mentions and hashtags, then collapse whitespace
+    words = texts.str.replace(_URL_RE, '', regex=True).str.split()
+    cleaned = words.str.join(' ')
     
     # Skip if text is too short after cleaning
-    if len(text.split()) < 3:
-        return ""
-        
-    return text
+    cleaned = cleaned.where(~is_news & (words.str.len() >= 3), '')
+    
+    # Tokenize once for the downstream opinion check
+    return cleaned, cleaned.str.lower().str.split()
 
-def analyze_sentiment(text):
+def analyze_sentiment(text, tokens=None):
     """
     Analyze sentiment using VADER with focus on opinion expressions.
+    
+    Args:
+        text (str): Cleaned tweet text
+        tokens (list): Lowercase words of text, as returned by clean_texts;
+            computed from text when omitted
     """
     if not text:
         return {
@@ -63,19 +134,15 @@ def analyze_sentiment(text):
             'compound': 0.0
         }
     
-    analyzer = SentimentIntensityAnalyzer()
-    scores = analyzer.polarity_scores(text)
+    scores = _VADER.polarity_scores(text)
     compound = scores['compound']
     
-    # Check for opinion indicators
-    opinion_words = [
-        'think', 'feel', 'believe', 'opinion', 'love', 'hate',
-        'amazing', 'terrible', 'worst', 'best', 'overrated',
-        'underrated', 'deserves', 'should', 'would', 'could',
-        'great', 'awful', 'bad', 'good', 'fantastic', 'horrible'
-    ]
-    
-    has_opinion = any(word in text.lower() for word in opinion_words)
+    # Check for opinion indicators, ignoring punctuation around words
+    if tokens is None:
+        tokens = text.lower().split()
+    has_opinion = not _OPINION_WORDS.isdisjoint(
+        token.strip(string.punctuation) for token in tokens
+    )
     
     # Adjust thresholds based on opinion presence
     if has_opinion:
@@ -106,111 +173,222 @@ def analyze_sentiment(text):
         'compound': round(compound, 2)
     }
 
-def plot_sentiment(df):
+def plot_sentiment(df, sentiment_counts):
     """
-    Create a sentiment distribution bar chart using Matplotlib.
+    Create a sentiment distribution bar chart using Altair.
     
     Args:
         df (pd.DataFrame): DataFrame with sentiment analysis results
+        sentiment_counts (pd.Series): Number of tweets per sentiment label
     """
-    # Clear any existing plots
-    plt.clf()
-    
-    # Extract sentiment values from the nested dictionary
-    df['sentiment_label'] = df['sentiment'].apply(lambda x: x['sentiment'] if isinstance(x, dict) else 'neutral')
-    
-    # Calculate sentiment counts and percentages
-    sentiment_counts = df['sentiment_label'].value_counts()
+    # Calculate sentiment percentages
     total = len(df)
-    percentages = (sentiment_counts / total * 100).round(1)
+    chart_df = pd.DataFrame({
+        'sentiment': sentiment_counts.index.astype(str),
+        'count': sentiment_counts.values,
+        'percentage': (sentiment_counts.values / total * 100).round(1)
+    })
+    chart_df['label'] = [
+        f"{count} ({percentage}%)"
+        for count, percentage in zip(chart_df['count'], chart_df['percentage'])
+    ]
     
     # Set up colors for each sentiment
-    colors = {
-        'positive': '#2ecc71',
-        'neutral': '#95a5a6',
-        'negative': '#e74c3c'
-    }
+    colors = ['#2ecc71', '#95a5a6', '#e74c3c']
+    
+    base = alt.Chart(chart_df, title='Sentiment Distribution').encode(
+        x=alt.X('sentiment:N', title='Sentiment', sort=_SENTIMENTS, axis=alt.Axis(labelAngle=0)),
+        y=alt.Y('count:Q', title='Number of Tweets')
+    )
+    bars = base.mark_bar().encode(
+        color=alt.Color(
+            'sentiment:N',
+            scale=alt.Scale(domain=_SENTIMENTS, range=colors),
+            legend=None
+        ),
+        tooltip=['sentiment', 'count', 'percentage']
+    )
     
-    # Create figure and axis with white background
-    fig, ax = plt.subplots(figsize=(10, 6))
-    ax.set_facecolor('white')
-    fig.patch.set_facecolor('white')
+    # Add value labels on top of bars
+    labels = base.mark_text(baseline='bottom', dy=-4).encode(text='label:N')
     
-    # Create bars with safe color mapping
-    x_pos = range(len(sentiment_counts))
-    bars = ax.bar(x_pos, sentiment_counts.values, 
-                 color=[colors.get(sent, '#95a5a6') for sent in sentiment_counts.index])
+    return bars + labels
+
+async def fetch_tweets(client, query, start_time, end_time, max_tweets=50):
+    """
+    Fetch tweets mentioning the celebrity within the date range.
+    Focus on opinion tweets rather than news headlines.
     
-    # Customize the plot
-    ax.set_title('Sentiment Distribution', pad=20, fontsize=14, fontweight='bold')
-    ax.set_xlabel('Sentiment', labelpad=10, fontsize=12)
-    ax.set_ylabel('Number of Tweets', labelpad=10, fontsize=12)
+    Returns:
+        dict: Parallel 'created_at' and 'text' lists, one entry per tweet
+    """
+    times = []
+    texts = []
     
-    # Set x-axis labels
-    ax.set_xticks(x_pos)
-    ax.set_xticklabels(sentiment_counts.index, fontsize=11)
+    # Construct query to focus on opinion tweets
+    opinion_terms = "(think OR feel OR believe OR love OR hate OR overrated OR underrated OR amazing OR terrible OR best OR worst OR good OR bad)"
+    filtered_query = f'"{query}" {opinion_terms} -is:retweet -has:links lang:en'
     
-    # Add grid for better readability
-    ax.yaxis.grid(True, linestyle='--', alpha=0.7)
-    ax.set_axisbelow(True)  # Put grid behind bars
+    # Use pagination to get tweets; the client waits out rate limits itself
+    async for response in AsyncPaginator(
+        client.search_recent_tweets,
+        query=filtered_query,
+        start_time=start_time,
+        end_time=end_time,
+        max_results=100,
+        tweet_fields=['created_at', 'text'],
+        limit=(max_tweets + 99) // 100
+    ):
+        if response.data:
+            times.extend(tweet.created_at for tweet in response.data)
+            texts.extend(tweet.text for tweet in response.data)
+            
+            if len(texts) >= max_tweets:
+                times, texts = times[:max_tweets], texts[:max_tweets]
+                break
     
-    # Add value labels on top of bars
-    for i, bar in enumerate(bars):
-        height = bar.get_height()
-        ax.text(bar.get_x() + bar.get_width()/2, height,
-                f'{int(height)}\n({percentages[sentiment_counts.index[i]]}%)',
-                ha='center', va='bottom',
-                fontsize=10)
+    return {'created_at': times, 'text': texts}
+
+@st.cache_resource(show_spinner=False)
+def _fetch_cache():
+    """
+    Process-wide store of recent fetches, one entry per celebrity.
     
-    # Remove top and right spines
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
+    st.cache_data can only be called, not queried, so it cannot tell which
+    names still need fetching. This maps (query, start_time, end_time,
+    max_tweets) to (fetched_at, tweets) and is guarded by the returned lock.
+    """
+    return threading.Lock(), {}
+
+def fetch_all_tweets(client, queries, start_time, end_time, max_tweets=50):
+    """
+    Fetch tweets for several celebrities concurrently, reusing any fetched
+    in the last _FETCH_TTL seconds so only uncached names hit the API.
     
-    # Adjust layout
-    plt.tight_layout()
+    Returns:
+        list: One fetch_tweets result per query, in the same order as
+            queries, or the exception raised while fetching it. Failed
+            fetches are not cached, so the next run retries them.
+    """
+    lock, cache = _fetch_cache()
+    now = time.monotonic()
+    keys = {query: (query, start_time, end_time, max_tweets) for query in queries}
+    
+    results = {}
+    with lock:
+        # Drop expired entries, then pick up the names that are still fresh
+        for key in [key for key, (fetched_at, _) in cache.items() if now - fetched_at >= _FETCH_TTL]:
+            del cache[key]
+        for query, key in keys.items():
+            if key in cache:
+                results[query] = cache[key][1]
     
-    return fig
+    missing = [query for query in queries if query not in results]
+    if missing:
+        async def gather():
+            return await asyncio.gather(*[
+                fetch_tweets(client, query, start_time, end_time, max_tweets)
+                for query in missing
+            ], return_exceptions=True)
+        
+        fetched = _run(gather())
+        with lock:
+            for query, tweets in zip(missing, fetched):
+                if not isinstance(tweets, BaseException):
+                    cache[keys[query]] = (now, tweets)
+                results[query] = tweets
+    
+    return [results[query] for query in queries]
 
-def fetch_tweets(client, query, start_time, end_time, max_tweets=50):
+def analyze_tweets(tweets):
     """
-    Fetch tweets mentioning the celebrity within the date range.
-    Focus on opinion tweets rather than news headlines.
+    Clean the fetched tweets and score their sentiment.
+    
+    Returns:
+        pd.DataFrame: Analyzed tweets, or None if none were usable
     """
-    tweets = []
+    if not tweets['text']:
+        st.warning("No valid tweets to analyze.")
+        return None
+        
+    cleaned, tokens = clean_texts(pd.Series(tweets['text']))
+    
+    # Drop tweets with empty cleaned text before building the DataFrame
+    keep = (cleaned.str.len() > 0).to_numpy()
+    df = pd.DataFrame({
+        'created_at': list(compress(tweets['created_at'], keep)),
+        'text': list(compress(tweets['text'], keep)),
+        'cleaned_text': list(compress(cleaned, keep))
+    })
+    
+    if df.empty:
+        st.warning("No valid tweets remained after cleaning.")
+        return None
+    
+    # Apply sentiment analysis and extract components in one pass,
+    # scoring each distinct text only once
+    scores = {}
+    for text, text_tokens in zip(df['cleaned_text'], compress(tokens, keep)):
+        if text not in scores:
+            scores[text] = analyze_sentiment(text, text_tokens)
+    results = [scores[text] for text in df['cleaned_text']]
+    df[['sentiment_label', 'confidence', 'compound']] = pd.DataFrame(
+        results, columns=['sentiment', 'confidence', 'compound']
+    )
+    df['sentiment_label'] = pd.Categorical(df['sentiment_label'], categories=_SENTIMENTS)
+    return df
+
+def display_results(df, celebrity_name, start_time, end_time):
+    """Render the sentiment plot, sample tweets and statistics for one celebrity."""
+    # Count sentiments once for the plot and statistics
+    sentiment_counts = df['sentiment_label'].value_counts(sort=False)
+    
+    # Display results
+    st.subheader(f"Analysis Results: {celebrity_name}")
+    st.write(f"Analyzed {len(df)} tweets about {celebrity_name} from {start_time.strftime('%Y-%m-%d %H:%M')} to {end_time.strftime('%Y-%m-%d %H:%M')}")
     
+    # Show sentiment distribution
     try:
-        # Construct query to focus on opinion tweets
-        opinion_terms = "(think OR feel OR believe OR love OR hate OR overrated OR underrated OR amazing OR terrible OR best OR worst OR good OR bad)"
-        filtered_query = f'"{query}" {opinion_terms} -is:retweet -has:links lang:en'
-        
-        # Use pagination to get tweets
-        for response in tweepy.Paginator(
-            client.search_recent_tweets,
-            query=filtered_query,
-            start_time=start_time,
-            end_time=end_time,
-            max_results=10,
-            tweet_fields=['created_at', 'text'],
-            limit=(max_tweets + 9) // 10
-        ):
-            if response.data:
-                tweets.extend([{
-                    'created_at': tweet.created_at,
-                    'text': tweet.text
-                } for tweet in response.data])
-                
-                if len(tweets) >= max_tweets:
-                    tweets = tweets[:max_tweets]
-                    break
-            
-            time.sleep(2)  # Be nice to the API
-            
-    except tweepy.TooManyRequests:
-        st.warning("Rate limit reached. Please wait a few minutes and try again.")
+        st.altair_chart(plot_sentiment(df, sentiment_counts), use_container_width=True)
     except Exception as e:
-        st.error(f"Error fetching tweets: {str(e)}")
+        st.error(f"Error generating plot: {str(e)}")
+    
+    # Display sample tweets with analysis
+    if len(df) > 0:
+        st.subheader("Sample Tweets with Analysis")
+        sample_rows = random.sample(range(len(df)), min(5, len(df)))
+        sample_df = df.iloc[sample_rows][['created_at', 'text', 'sentiment_label', 'confidence']]
+        
+        # Color the sentiment column by label
+        st.dataframe(
+            sample_df.style.apply(
+                lambda labels: [f'background-color: {_COLOR_MAP[label]}' for label in labels],
+                subset=['sentiment_label']
+            ),
+            use_container_width=True
+        )
+        
+        # Display analysis statistics
+        st.subheader("Analysis Statistics")
+        col1, col2 = st.columns(2)
         
-    return tweets
+        with col1:
+            avg_confidence = df['confidence'].mean()
+            st.metric("Average Confidence", f"{avg_confidence:.2f}")
+        with col2:
+            # Break ties alphabetically, as mode() did
+            top_count = sentiment_counts.max()
+            most_common = min(
+                label for label, count in sentiment_counts.items() if count == top_count
+            )
+            st.metric("Most Common Sentiment", most_common)
+            
+        # Display sentiment percentages
+        total = len(df)
+        st.write("\nSentiment Distribution:")
+        for sentiment, count in sentiment_counts.items():
+            percentage = (count / total * 100)
+            st.write(f"{sentiment.title()}: {count} tweets ({percentage:.1f}%)")
 
 def main():
     st.title("Celebrity Twitter Sentiment 🐦")
@@ -220,13 +398,20 @@ def main():
         # Initialize Twitter client
         client = setup_twitter_client()
         if not client:
+            # Don't keep the failure cached so fixed secrets are picked up
+            setup_twitter_client.clear()
             return
         
         # User inputs
-        celebrity_name = st.text_input("Celebrity Name", placeholder="e.g., Taylor Swift")
+        celebrity_name = st.text_input(
+            "Celebrity Name(s)",
+            placeholder="e.g., Taylor Swift, Beyoncé",
+            help="Separate several names with commas to compare them."
+        )
         
         # Date range selection with max 7 days for free API
-        end_time = datetime.utcnow() - timedelta(minutes=1)  # Fixed datetime call
+        # Truncate to the minute so reruns reuse cached fetches
+        end_time = (datetime.utcnow() - timedelta(minutes=1)).replace(second=0, microsecond=0)
         date_option = st.radio(
             "Select Time Period",
             ["Last 24 hours", "Last 3 days", "Last 7 days"]
@@ -242,93 +427,42 @@ def main():
         max_tweets = st.slider("Maximum number of tweets to analyze", 10, 100, 50)
         
         if st.button("Run Analysis"):
-            if not celebrity_name:
+            # Split comma-separated names, dropping blanks and duplicates
+            celebrity_names = list(dict.fromkeys(
+                name.strip() for name in celebrity_name.split(',') if name.strip()
+            ))
+            if not celebrity_names:
                 st.warning("Please enter a celebrity name.")
                 return
                 
-            with st.spinner("Fetching tweets..."):
-                tweets = fetch_tweets(
+            # The client sleeps through Twitter rate limits rather than failing
+            with st.spinner(
+                "Fetching tweets... If the Twitter rate limit has been reached, "
+                "this waits until it resets (up to 15 minutes)."
+            ):
+                all_tweets = fetch_all_tweets(
                     client,
-                    celebrity_name.strip(),  # Remove any extra whitespace
+                    celebrity_names,
                     start_time,
                     end_time,
                     max_tweets
                 )
                 
-            if not tweets:
-                st.warning(f"No tweets found mentioning {celebrity_name} in the selected date range.")
-                return
-                
-            # Create DataFrame and analyze sentiment
-            with st.spinner("Analyzing sentiment..."):
-                df = pd.DataFrame(tweets)
-                if df.empty:
-                    st.warning("No valid tweets to analyze.")
-                    return
+            for name, tweets in zip(celebrity_names, all_tweets):
+                if isinstance(tweets, BaseException):
+                    st.error(f"Error fetching tweets about {name}: {str(tweets)}")
+                    continue
+                if not tweets['text']:
+                    st.warning(f"No tweets found mentioning {name} in the selected date range.")
+                    continue
                     
-                df['cleaned_text'] = df['text'].apply(clean_text)
-                
-                # Remove rows with empty cleaned text
-                df = df[df['cleaned_text'].str.len() > 0].reset_index(drop=True)
-                
-                if df.empty:
-                    st.warning("No valid tweets remained after cleaning.")
-                    return
-                
-                # Apply sentiment analysis and extract components
-                sentiment_results = df['cleaned_text'].apply(analyze_sentiment)
-                df['sentiment'] = sentiment_results
-                df['sentiment_label'] = sentiment_results.apply(lambda x: x['sentiment'])
-                df['confidence'] = sentiment_results.apply(lambda x: x['confidence'])
-                
-            # Display results
-            st.subheader("Analysis Results")
-            st.write(f"Analyzed {len(df)} tweets about {celebrity_name} from {start_time.strftime('%Y-%m-%d %H:%M')} to {end_time.strftime('%Y-%m-%d %H:%M')}")
-            
-            # Show sentiment distribution
-            try:
-                fig = plot_sentiment(df)
-                if fig:
-                    st.pyplot(fig)
-                else:
-                    st.warning("Could not generate sentiment plot.")
-            except Exception as e:
-                st.error(f"Error generating plot: {str(e)}")
-            
-            # Display sample tweets with analysis
-            if len(df) > 0:
-                st.subheader("Sample Tweets with Analysis")
-                sample_size = min(5, len(df))
-                sample_df = df.sample(sample_size)[['created_at', 'text', 'sentiment_label', 'confidence']]
-                
-                # Format the dataframe
-                def format_row(row):
-                    color = '#2ecc7133' if row['sentiment_label'] == 'positive' else '#e74c3c33' if row['sentiment_label'] == 'negative' else '#95a5a633'
-                    return [f'background-color: {color}'] * len(row)
-                
-                st.dataframe(
-                    sample_df.style.apply(format_row, axis=1),
-                    use_container_width=True
-                )
-                
-                # Display analysis statistics
-                st.subheader("Analysis Statistics")
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    avg_confidence = df['confidence'].mean()
-                    st.metric("Average Confidence", f"{avg_confidence:.2f}")
-                with col2:
-                    most_common = df['sentiment_label'].mode()[0]
-                    st.metric("Most Common Sentiment", most_common)
+                # Create DataFrame and analyze sentiment
+                with st.spinner(f"Analyzing sentiment for {name}..."):
+                    df = analyze_tweets(tweets)
+                if df is None:
+                    continue
                     
-                # Display sentiment percentages
-                sentiment_counts = df['sentiment_label'].value_counts()
-                total = len(df)
-                st.write("\nSentiment Distribution:")
-                for sentiment, count in sentiment_counts.items():
-                    percentage = (count / total * 100)
-                    st.write(f"{sentiment.title()}: {count} tweets ({percentage:.1f}%)")
+                display_results(df, name, start_time, end_time)
                     
     except Exception as e:
         st.error(f"An error occurred: {str(e)}")